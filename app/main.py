@@ -1,67 +1,329 @@
 import discord
-import feedparser
-import requests
+import aiohttp
 from bs4 import BeautifulSoup
+from dotenv import load_dotenv
+from lxml import etree
+from collections import OrderedDict
+from dataclasses import dataclass
+from email.utils import mktime_tz, parsedate_tz
+from html.entities import name2codepoint
+from urllib.parse import urljoin
 import asyncio
+import heapq
+import html
+import os
+import re
+import signal
 
-TOKEN = "SEU_TOKEN_AQUI"
-CHANNEL_ID = 123456789012345678  # id do canal
+MIN_INTERVAL = 60  # segundos; o máximo é o dobro do CHECK_INTERVAL
 
-RSS_URL = "https://www.gamespot.com/feeds/news/"
+@dataclass(slots=True, frozen=True)
+class Config:
+    token: str
+    channel_id: int  # id do canal
+    rss_url: str
+    check_interval: float  # segundos entre cada leitura do feed
+    max_posts: int  # itens do feed olhados por ciclo
+
+    def __post_init__(self):
+        if self.check_interval < MIN_INTERVAL:
+            raise ValueError(f"CHECK_INTERVAL precisa ser pelo menos {MIN_INTERVAL} segundos")
+        if self.max_posts < 1:
+            raise ValueError("MAX_POSTS precisa ser pelo menos 1")
+
+    @classmethod
+    def from_env(cls):
+        load_dotenv()
+        return cls(
+            token=os.getenv("DISCORD_TOKEN", "SEU_TOKEN_AQUI").strip(),
+            channel_id=int(os.getenv("CHANNEL_ID", "123456789012345678")),
+            rss_url=os.getenv("RSS_URL", "https://www.gamespot.com/feeds/news/").strip(),
+            check_interval=float(os.getenv("CHECK_INTERVAL", "900")),  # 15 minutos
+            max_posts=int(os.getenv("MAX_POSTS", "5")),
+        )
+
+CFG = Config.from_env()
+
+USER_AGENT = "Mozilla/5.0"
+HEAD_SCAN_LIMIT = 64 * 1024  # bytes lidos procurando o og:image
+
+# caminho rápido pro og:image; os atributos podem vir em qualquer ordem
+OG_RE = re.compile(rb'<meta[^>]+property=["\']og:image["\'][^>]+content=["\']([^"\']+)["\']', re.I)
+OG_RE_REVERSED = re.compile(rb'<meta[^>]+content=["\']([^"\']+)["\'][^>]+property=["\']og:image["\']', re.I)
+HEAD_END_RE = re.compile(rb"</head\s*>", re.I)
+
+HEADERS = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+FEED_TIMEOUT = aiohttp.ClientTimeout(total=20)
+ARTICLE_TIMEOUT = aiohttp.ClientTimeout(total=10)
+RETRY_STATUSES = (429, 502, 503, 504)
+MAX_RETRIES = 3
+MAX_RETRY_WAIT = 30  # segundos; com Retry-After maior a resposta volta sem nova tentativa
+MAX_EMBEDS = 10  # limite do Discord por mensagem
+POSTED_CAP = 2048  # ids lembrados; bem mais do que a janela do feed
+
+# XPaths do feed, compiladas uma vez só
+NS = {"media": "http://search.yahoo.com/mrss/"}
+ITEM_XP = etree.XPath("/rss/channel/item")
+TITLE_XP = etree.XPath("string(title)", smart_strings=False)
+LINK_XP = etree.XPath("string(link)", smart_strings=False)
+GUID_XP = etree.XPath("string(guid)", smart_strings=False)
+PUBDATE_XP = etree.XPath("string(pubDate)", smart_strings=False)
+DESCRIPTION_XP = etree.XPath("string(description)", smart_strings=False)
+THUMBNAIL_XP = etree.XPath("media:thumbnail/@url", namespaces=NS, smart_strings=False)
+CONTENT_XP = etree.XPath("media:content/@url", namespaces=NS, smart_strings=False)
+ENCLOSURE_XP = etree.XPath("enclosure[@url]")
+FEED_PARSER = etree.XMLParser(resolve_entities=False, no_network=True, recover=True)
+# entidades HTML (&nbsp;, &eacute;...) que o XML não conhece; no modo recover elas sumiriam
+HTML_ENTITY_RE = re.compile(rb"&([A-Za-z][A-Za-z0-9]*);")
+XML_ENTITIES = {"amp", "lt", "gt", "quot", "apos"}
+
+# ETag / Last-Modified da última resposta de cada feed
+feed_meta = {}
+
+# setado no SIGTERM pra encerrar o loop sem esperar o próximo ciclo
+STOP = asyncio.Event()
+close_task = None  # referência pro asyncio não coletar a task do client.close()
 
 intents = discord.Intents.default()
 client = discord.Client(intents=intents)
 
-def get_image_from_article(url):
+async def http_get(session, url, **kwargs):
+    # tenta de novo em 429/5xx, respeitando o Retry-After quando vier
+    for attempt in range(MAX_RETRIES + 1):
+        r = await session.get(url, **kwargs)
+        if r.status not in RETRY_STATUSES or attempt == MAX_RETRIES:
+            return r
+        retry_after = r.headers.get("Retry-After", "")
+        wait = int(retry_after) if retry_after.isdigit() else 0.5 * 2 ** attempt
+        if wait > MAX_RETRY_WAIT:
+            return r  # servidor pediu pra esperar mais: desiste em vez de insistir antes da hora
+        r.release()
+        await asyncio.sleep(wait)
+
+def og_image_from_head(head):
+    m = OG_RE.search(head) or OG_RE_REVERSED.search(head)
+    if m:
+        return html.unescape(m.group(1).decode("utf-8", "replace"))
+
+    # regex não achou: passa o mesmo trecho pelo parser de HTML
+    parser = etree.HTMLPullParser(events=("start",))
+    parser.feed(head)
+    for _, el in parser.read_events():
+        if el.tag == "meta" and el.get("property") == "og:image":
+            return el.get("content")
+    return None
+
+async def get_image_from_article(session, url):
+    image_url = None
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        r = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(r.text, "html.parser")
-        og = soup.find("meta", property="og:image")
-        if og:
-            return og["content"]
-    except:
-        return None
+        # só o <head> interessa: para de ler no </head> ou no limite
+        async with await http_get(session, url, timeout=ARTICLE_TIMEOUT) as r:
+            r.raise_for_status()
+            base_url = str(r.url)  # url final, depois dos redirects
+            head = bytearray()
+            async for chunk in r.content.iter_chunked(8192):
+                head += chunk
+                if len(head) >= HEAD_SCAN_LIMIT or HEAD_END_RE.search(head, max(0, len(head) - len(chunk) - 8)):
+                    break
+        image_url = og_image_from_head(bytes(head[:HEAD_SCAN_LIMIT]))
+        if image_url:
+            # og:image relativo ("/img/x.jpg") faria o Discord recusar a mensagem toda
+            image_url = urljoin(base_url, image_url.strip())
+    except (aiohttp.ClientError, asyncio.TimeoutError, etree.LxmlError, ValueError):
+        image_url = None
+    return image_url
+
+def pick_image(entry):
+    # o feed já traz a imagem da matéria na maioria dos itens
+    for key in ("media_thumbnail", "media_content"):
+        if entry[key]:
+            return entry[key][0]
+    for href, type_ in entry["enclosures"]:
+        if type_.startswith("image/"):
+            return href
+    return None
+
+async def find_image(session, entry):
+    return pick_image(entry) or await get_image_from_article(session, entry["link"])
+
+def parse_date(pub_date):
+    # 0.0 pra data ausente, ilegível ou fora do intervalo (ex.: ano 20255)
+    parsed = parsedate_tz(pub_date)
+    if not parsed:
+        return 0.0
+    try:
+        return mktime_tz(parsed)
+    except (ValueError, OverflowError):
+        return 0.0
+
+def html_entity_to_xml(m):
+    name = m.group(1).decode("ascii")
+    if name in XML_ENTITIES or name not in name2codepoint:
+        return m.group(0)
+    return b"&#%d;" % name2codepoint[name]
+
+def parse_feed(content):
+    content = HTML_ENTITY_RE.sub(html_entity_to_xml, content)
+    root = etree.fromstring(content, FEED_PARSER)
+    if root is None:
+        return []
+
+    entries = []
+    for item in ITEM_XP(root):
+        title = TITLE_XP(item).strip()
+        link = LINK_XP(item).strip()
+
+        # id calculado uma vez aqui; o guid quase sempre existe no RSS 2.0
+        item_id = GUID_XP(item).strip() or link
+        pub_date = PUBDATE_XP(item)
+        if not item_id:
+            item_id = f"{title}::{pub_date}"
+
+        entries.append({
+            "id": item_id,
+            "title": title,
+            "link": link,
+            "published": parse_date(pub_date),
+            "summary": DESCRIPTION_XP(item),
+            "media_thumbnail": THUMBNAIL_XP(item),
+            "media_content": CONTENT_XP(item),
+            "enclosures": [(el.get("url"), el.get("type", "")) for el in ENCLOSURE_XP(item)],
+        })
+    return entries
+
+async def fetch_rss(session, url):
+    headers = {}
+    etag, last_modified = feed_meta.get(url, (None, None))
+    if etag:
+        headers["If-None-Match"] = etag
+    if last_modified:
+        headers["If-Modified-Since"] = last_modified
+
+    async with await http_get(session, url, headers=headers, timeout=FEED_TIMEOUT) as r:
+        if r.status == 304:
+            return None
+        r.raise_for_status()
+        content = await r.read()
+        validators = (r.headers.get("ETag"), r.headers.get("Last-Modified"))
+
+    # só guarda o ETag depois de ler e parsear; senão o próximo 304 perderia essa versão
+    entries = parse_feed(content)
+    if not entries:
+        print("Feed sem itens (só RSS 2.0 é suportado):", url)
+    feed_meta[url] = validators
+    return entries
+
+def newest_entries(entries, n):
+    # o feed já vem do mais novo pro mais antigo; só ordena se não vier
+    dates = [e["published"] for e in entries]
+    if all(a >= b for a, b in zip(dates, dates[1:])):
+        return entries[:n]
+    return heapq.nlargest(n, entries, key=lambda e: e["published"])
 
 def clean_html(text):
-    soup = BeautifulSoup(text, "html.parser")
+    soup = BeautifulSoup(text, "lxml")
     return soup.get_text()
 
+def build_embed(entry, image_url):
+    description = clean_html(entry["summary"]).strip()
+    if len(description) > 300:
+        description = description[:297] + "..."
+
+    embed = discord.Embed(
+        title=entry["title"],
+        description=description,
+        url=entry["link"],
+        color=0x5865F2
+    )
+
+    if image_url:
+        embed.set_image(url=image_url)
+
+    return embed
+
+def request_stop():
+    # fecha o client direto: funciona mesmo se o post_news já tiver morrido
+    global close_task
+    STOP.set()
+    if close_task is None:
+        close_task = asyncio.ensure_future(client.close())
+
 async def post_news():
     await client.wait_until_ready()
-    channel = client.get_channel(CHANNEL_ID)
-    posted = set()
+    channel = client.get_channel(CFG.channel_id)
+    posted = OrderedDict()  # LRU dos ids já postados
+    interval = CFG.check_interval
+
+    loop = asyncio.get_running_loop()
+    try:
+        loop.add_signal_handler(signal.SIGTERM, request_stop)
+    except NotImplementedError:
+        pass  # Windows
+
+    # se a task morrer por qualquer erro, o bot fecha junto em vez de ficar no ar mudo
+    try:
+        connector = aiohttp.TCPConnector(limit_per_host=4)
+        async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+            while not STOP.is_set():
+                try:
+                    entries = await fetch_rss(session, CFG.rss_url)
+                except (aiohttp.ClientError, asyncio.TimeoutError, etree.XMLSyntaxError) as e:
+                    # XMLSyntaxError: corpo vazio ou ilegível, mesmo com recover=True
+                    print("Erro ao buscar o feed:", e)
+                    entries = None
+
+                # None = 304 Not Modified, nada novo neste ciclo
+                new_entries = []
+                for entry in newest_entries(entries or [], CFG.max_posts):
+                    if entry["id"] in posted:
+                        posted.move_to_end(entry["id"])  # ainda no feed: renova no LRU
+                    else:
+                        new_entries.append(entry)
 
-    while True:
-        feed = feedparser.parse(RSS_URL)
+                # as imagens que faltam são buscadas em paralelo
+                images = await asyncio.gather(*(find_image(session, e) for e in new_entries))
 
-        for entry in feed.entries[:5]:
-            if entry.link in posted:
-                continue
+                embeds = [build_embed(e, image_url) for e, image_url in zip(new_entries, images)]
 
-            title = entry.title
-            description = clean_html(entry.summary)
-            link = entry.link
-            image_url = get_image_from_article(link)
+                # o Discord aceita até MAX_EMBEDS por mensagem: manda em lotes
+                sent = 0
+                for start in range(0, len(embeds), MAX_EMBEDS):
+                    batch = slice(start, start + MAX_EMBEDS)
+                    try:
+                        await channel.send(embeds=embeds[batch])
+                    except discord.HTTPException as e:
+                        # erro do Discord (5xx, embed inválido...): não marca o lote e
+                        # esquece o ETag, senão o próximo 304 esconderia esses itens
+                        print("Erro ao enviar as notícias:", e)
+                        feed_meta.pop(CFG.rss_url, None)
+                        continue
 
-            embed = discord.Embed(
-                title=title,
-                description=description[:300] + "...",
-                url=link,
-                color=0x5865F2
-            )
+                    for entry in new_entries[batch]:
+                        posted[entry["id"]] = None
+                        sent += 1
 
-            if image_url:
-                embed.set_image(url=image_url)
+                while len(posted) > POSTED_CAP:
+                    posted.popitem(last=False)
 
-            await channel.send(embed=embed)
-            posted.add(entry.link)
+                # com novidade lê o feed mais vezes; sem novidade (ou 304) espaça
+                interval = interval / 2 if sent else interval * 2
+                interval = min(max(MIN_INTERVAL, interval), CFG.check_interval * 2)
 
-        await asyncio.sleep(900)  # 15 minutos
+                try:
+                    await asyncio.wait_for(STOP.wait(), interval)
+                except asyncio.TimeoutError:
+                    pass
+    finally:
+        try:
+            loop.remove_signal_handler(signal.SIGTERM)
+        except NotImplementedError:
+            pass
+        await client.close()
 
 @client.event
 async def on_ready():
     print("Bot online:", client.user)
     client.loop.create_task(post_news())
 
-client.run(TOKEN)
+if __name__ == "__main__":
+    client.run(CFG.token)
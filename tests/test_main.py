@@ -0,0 +1,126 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import aiohttp
+import pytest
+from aiohttp import web
+from lxml import etree
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+
+import main  # noqa: E402
+
+FEED = b"""<?xml version="1.0"?>
+<rss xmlns:media="http://search.yahoo.com/mrss/"><channel>
+<item>
+  <title> A &amp; B &nbsp;C &eacute; </title>
+  <link> https://www.gamespot.com/articles/1 </link>
+  <guid>gs-1</guid>
+  <pubDate>Tue, 13 Oct 2026 10:00:00 -0300</pubDate>
+  <description><![CDATA[<p>resumo</p>]]></description>
+  <media:thumbnail url="https://img/1.jpg"/>
+</item>
+<item>
+  <title>Sem guid</title>
+  <link>https://www.gamespot.com/articles/2</link>
+  <pubDate>Mon, 01 Jan 20255 10:00:00 +0000</pubDate>
+  <enclosure url="https://img/2.png" type="image/png"/>
+</item>
+<item>
+  <title>Sem link</title>
+  <pubDate>data ruim</pubDate>
+</item>
+</channel></rss>"""
+
+
+def test_parse_feed_fields():
+    first, second, third = main.parse_feed(FEED)
+
+    assert first["id"] == "gs-1"
+    assert first["link"] == "https://www.gamespot.com/articles/1"
+    assert first["published"] == 1791896400
+    assert first["summary"] == "<p>resumo</p>"
+    assert main.pick_image(first) == "https://img/1.jpg"
+
+    assert second["id"] == "https://www.gamespot.com/articles/2"
+    assert main.pick_image(second) == "https://img/2.png"
+
+    assert third["id"] == "Sem link::data ruim"
+    assert main.pick_image(third) is None
+
+
+def test_parse_feed_keeps_html_entities():
+    title = main.parse_feed(FEED)[0]["title"]
+    assert title == "A & B \xa0C \xe9"
+
+
+def test_parse_feed_out_of_range_dates_are_undated():
+    _, second, third = main.parse_feed(FEED)
+    assert second["published"] == 0.0
+    assert third["published"] == 0.0
+
+
+def test_parse_feed_non_rss_is_empty():
+    atom = b'<feed xmlns="http://www.w3.org/2005/Atom"><entry><title>x</title></entry></feed>'
+    assert main.parse_feed(atom) == []
+
+
+def test_parse_feed_empty_body_raises():
+    with pytest.raises(etree.XMLSyntaxError):
+        main.parse_feed(b"")
+
+
+@pytest.mark.parametrize("head", [
+    b'<head><meta property="og:image" content="https://i/a.jpg?x=1&amp;y=2"></head>',
+    b"<HEAD><META content='https://i/a.jpg?x=1&amp;y=2' data-x=1 property='og:image'></HEAD>",
+    b"<head><meta property=og:image content=https://i/a.jpg?x=1&amp;y=2></head>",
+])
+def test_og_image_from_head(head):
+    assert main.og_image_from_head(head) == "https://i/a.jpg?x=1&y=2"
+
+
+def test_og_image_from_head_missing():
+    assert main.og_image_from_head(b'<head><meta name="description" content="x"></head>') is None
+
+
+def test_newest_entries_trusts_sorted_feed():
+    entries = [{"id": i, "published": p} for i, p in enumerate([30.0, 20.0, 20.0, 10.0])]
+    assert main.newest_entries(entries, 2) == entries[:2]
+
+
+def test_newest_entries_sorts_when_needed():
+    entries = [{"id": i, "published": p} for i, p in enumerate([10.0, 30.0, 0.0, 20.0])]
+    assert [e["id"] for e in main.newest_entries(entries, 2)] == [1, 3]
+
+
+async def scrape(path):
+    async def article(request):
+        return web.Response(text='<head><meta property="og:image" content="/img/x.jpg"></head>',
+                            content_type="text/html")
+
+    async def missing(request):
+        return web.Response(status=404, text='<head><meta property="og:image" content="/404.jpg"></head>')
+
+    app = web.Application()
+    app.router.add_get("/news/article", article)
+    app.router.add_get("/news/missing", missing)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            return await main.get_image_from_article(session, f"http://127.0.0.1:{port}{path}")
+    finally:
+        await runner.cleanup()
+
+
+def test_get_image_from_article_resolves_relative_url():
+    image_url = asyncio.run(scrape("/news/article"))
+    assert image_url.startswith("http://127.0.0.1:") and image_url.endswith("/img/x.jpg")
+
+
+def test_get_image_from_article_ignores_error_pages():
+    assert asyncio.run(scrape("/news/missing")) is None